@@ -1,107 +1,148 @@
 import argparse
 import csv
+import pickle
+from functools import lru_cache
 from pathlib import Path
 
 
 MISSING_SENTINEL = -999.0
+INDEX_CACHE_SUFFIX = ".popgrp.pkl"
 PANTHERIA_POP_COLUMN = "10-1_PopulationGrpSize"
 DEFAULT_OUTPUT_SUFFIX = "_with_population_grp_size"
 
 
 def normalize_name(value: str) -> str:
-    return " ".join((value or "").strip().lower().split())
+    # str.split() with no separator already drops leading/trailing whitespace.
+    if not value:
+        return ""
+    return " ".join(value.lower().split())
 
 
 def to_binomial(normalized_name: str) -> str:
-    parts = normalized_name.split()
-    if len(parts) >= 2:
-        return f"{parts[0]} {parts[1]}"
-    return normalized_name
-
-
-def parse_pantheria_number(raw: str):
-    if raw is None:
-        return None
-    raw = raw.strip()
-    if not raw:
-        return None
-    try:
-        value = float(raw)
-    except ValueError:
-        return None
-    if value <= MISSING_SENTINEL:
-        return None
-    return value
+    genus, sep, rest = normalized_name.partition(" ")
+    if not sep:
+        return normalized_name
+    species = rest.partition(" ")[0]
+    return f"{genus} {species}"
 
 
+# Group sizes take only ~150 distinct values, so each is formatted once.
+@lru_cache(maxsize=None)
 def format_number(value: float) -> str:
-    if abs(value - round(value)) < 1e-9:
-        return str(int(round(value)))
-    text = f"{value:.2f}"
-    return text.rstrip("0").rstrip(".")
+    rounded = round(value)
+    if abs(value - rounded) < 1e-9:
+        return str(int(rounded))
+    return ("%.2f" % value).rstrip("0").rstrip(".")
 
 
-def load_pantheria_index(path: Path):
+def build_pantheria_index(path: Path):
     index = {}
     with path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter="\t")
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"No header found in {path}")
+        bin_idx = header.index("MSW05_Binomial")
+        pop_idx = header.index(PANTHERIA_POP_COLUMN)
+
         for row in reader:
-            key = normalize_name(row.get("MSW05_Binomial", ""))
+            # Keys are always binomials, so each mammal needs exactly one lookup.
+            key = to_binomial(normalize_name(row[bin_idx])) if bin_idx < len(row) else ""
             if key and key not in index:
-                index[key] = row
+                index[key] = row[pop_idx] if pop_idx < len(row) else ""
+    return index
+
+
+def load_pantheria_index(path: Path):
+    # The parsed index is pickled beside the TSV and reused until the TSV changes.
+    cache_path = path.with_name(path.name + INDEX_CACHE_SUFFIX)
+    stat = path.stat()
+    cache_key = (stat.st_mtime_ns, stat.st_size, [PANTHERIA_POP_COLUMN])
+    try:
+        with cache_path.open("rb") as f:
+            cached_key, index = pickle.load(f)
+        if cached_key == cache_key:
+            return index
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    index = build_pantheria_index(path)
+    try:
+        with cache_path.open("wb") as f:
+            pickle.dump((cache_key, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
     return index
 
 
 def fill_population_group_size(
     mammals_path: Path, pantheria_index, output_path: Path, target_column: str
 ):
-    stats = {
-        "total": 0,
-        "matched": 0,
-        "filled": 0,
-        "missing_trait": 0,
-        "no_match": 0,
-    }
-
-    with mammals_path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        if not fieldnames:
+    total = matched = filled = missing_trait = no_match = 0
+
+    # Rows are written as they are filled; the temp file is swapped in at the end so
+    # the output can safely be the input file.
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with mammals_path.open("r", newline="", encoding="utf-8") as f, tmp_path.open(
+        "w", newline="", encoding="utf-8"
+    ) as out_f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
             raise ValueError(f"No header found in {mammals_path}")
 
-        if target_column not in fieldnames:
-            fieldnames = [*fieldnames, target_column]
-
-        rows = []
+        sci_idx = header.index("scientific_name") if "scientific_name" in header else None
+        if target_column in header:
+            out_header = header
+            target_idx = header.index(target_column)
+        else:
+            out_header = [*header, target_column]
+            target_idx = len(header)
+        width = len(out_header)
+        writer = csv.writer(out_f)
+        writer.writerow(out_header)
+
+        # Hot loop: helpers are bound to locals and PanTHERIA values are parsed inline
+        # (blank, unparsable and sentinel values count as missing).
+        normalize = normalize_name
+        binomial = to_binomial
+        lookup = pantheria_index.get
+        fmt = format_number
+        writerow = writer.writerow
         for row in reader:
-            stats["total"] += 1
-            sci_name = normalize_name(row.get("scientific_name", ""))
-            pantheria_row = pantheria_index.get(sci_name)
-            if pantheria_row is None:
-                pantheria_row = pantheria_index.get(to_binomial(sci_name))
-
-            if pantheria_row is None:
-                stats["no_match"] += 1
-                row[target_column] = row.get(target_column, "")
-                rows.append(row)
+            if not row:
+                continue
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            total += 1
+            pantheria_value = lookup(binomial(normalize(row[sci_idx])) if sci_idx is not None else "")
+
+            if pantheria_value is None:
+                no_match += 1
+                writerow(row)
                 continue
 
-            stats["matched"] += 1
-            raw_value = parse_pantheria_number(pantheria_row.get(PANTHERIA_POP_COLUMN))
-            if raw_value is None:
-                stats["missing_trait"] += 1
-                row[target_column] = row.get(target_column, "")
+            matched += 1
+            raw = pantheria_value.strip()
+            try:
+                value = float(raw) if raw else None
+            except ValueError:
+                value = None
+            if value is None or value <= MISSING_SENTINEL:
+                missing_trait += 1
             else:
-                row[target_column] = format_number(raw_value)
-                stats["filled"] += 1
-            rows.append(row)
-
-    with output_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    return stats
+                row[target_idx] = fmt(value)
+                filled += 1
+            writerow(row)
+
+    tmp_path.replace(output_path)
+    return {
+        "total": total,
+        "matched": matched,
+        "filled": filled,
+        "missing_trait": missing_trait,
+        "no_match": no_match,
+    }
 
 
 def default_paths():
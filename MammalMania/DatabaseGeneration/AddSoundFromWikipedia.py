@@ -4,12 +4,16 @@ from __future__ import annotations
 import argparse
 import csv
 import re
+import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
 from urllib.parse import unquote, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 ENWIKI_API = "https://en.wikipedia.org/w/api.php"
@@ -45,39 +49,87 @@ DEPRIORITIZE_AUDIO_KEYWORDS = {
     "wikipedia",
     "ll-q",
 }
+# Open formats get a small scoring bonus.
+PREFERRED_AUDIO_EXTENSIONS = (".ogg", ".oga", ".opus")
+PREFERRED_AUDIO_RE = re.compile("|".join(map(re.escape, sorted(PREFERRED_AUDIO_KEYWORDS))))
+DEPRIORITIZE_AUDIO_RE = re.compile("|".join(map(re.escape, sorted(DEPRIORITIZE_AUDIO_KEYWORDS))))
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Titles are re-normalized several times per candidate while scoring.
+TITLE_CACHE_SIZE = 1 << 16
 DEFAULT_OUTPUT_SUFFIX = "_with_sound"
 
+# Fixed query parameters; callers only add "titles" (and continuation keys).
+PAGE_IMAGES_PARAMS = {
+    "action": "query",
+    "prop": "images",
+    "imlimit": "max",
+    "format": "json",
+}
+AUDIO_INFO_PARAMS = {
+    "action": "query",
+    "prop": "imageinfo",
+    "iiprop": "url|mime",
+    "format": "json",
+}
+DEFAULT_CACHE_NAME = ".wiki_sound_cache.sqlite3"
+
+T = TypeVar("T")
+DEFAULT_WORKERS = 8
+# MediaWiki accepts up to 50 titles per query for non-bot clients.
+MAX_TITLES_PER_QUERY = 50
+
 
-def session() -> requests.Session:
+def session(pool_size: int = DEFAULT_WORKERS) -> requests.Session:
     s = requests.Session()
     s.headers.update({"User-Agent": USER_AGENT})
+    # One kept-alive connection per worker and host; the default pool holds 10, so
+    # more workers than that would keep reopening TLS connections.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
     return s
 
 
-def _get_json(
+def _get(
     s: requests.Session,
     url: str,
     *,
     params: Optional[dict] = None,
+    headers: Optional[dict] = None,
     timeout: int = 30,
-) -> dict:
+) -> requests.Response:
+    # Raises once retries run out, so callers never mistake throttling for an empty
+    # result (which would otherwise be cached as a blank sound).
     last_exc: Optional[Exception] = None
     for attempt in range(6):
         try:
-            response = s.get(url, params=params, timeout=timeout)
+            response = s.get(url, params=params, headers=headers, timeout=timeout)
             if response.status_code in (429, 503):
+                last_exc = requests.HTTPError(
+                    f"{response.status_code} from {url} after {attempt + 1} attempts",
+                    response=response,
+                )
                 time.sleep(1.5 * (attempt + 1))
                 continue
             response.raise_for_status()
-            return response.json()
+            return response
         except requests.RequestException as exc:
             last_exc = exc
             time.sleep(1.5 * (attempt + 1))
-    if last_exc is not None:
-        raise last_exc
-    return {}
+    assert last_exc is not None
+    raise last_exc
 
 
+def _get_json(
+    s: requests.Session,
+    url: str,
+    *,
+    params: Optional[dict] = None,
+    timeout: int = 30,
+) -> dict:
+    return _get(s, url, params=params, timeout=timeout).json()
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
 def normalize_title(value: str) -> str:
     clean = unquote((value or "").strip())
     if not clean:
@@ -88,6 +140,7 @@ def normalize_title(value: str) -> str:
     return clean.strip()
 
 
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
 def normalize_file_title(file_title: str) -> str:
     clean = normalize_title(file_title)
     if not clean:
@@ -95,12 +148,16 @@ def normalize_file_title(file_title: str) -> str:
     return f"File:{clean}"
 
 
-def wikipedia_title_from_row(row: Dict[str, str]) -> str:
-    title = normalize_title(row.get("wikipedia_title", ""))
+def column_index(header: List[str], name: str) -> Optional[int]:
+    return header.index(name) if name in header else None
+
+
+def wikipedia_title_from_fields(wikipedia_title: str, source_url: str) -> str:
+    title = normalize_title(wikipedia_title)
     if title:
         return title
 
-    source_url = (row.get("source_url") or "").strip()
+    source_url = source_url.strip()
     if not source_url:
         return ""
     parsed = urlparse(source_url)
@@ -112,59 +169,112 @@ def wikipedia_title_from_row(row: Dict[str, str]) -> str:
 
 
 def is_audio_filename(file_title: str) -> bool:
-    clean = normalize_title(file_title).lower()
-    return any(clean.endswith(ext) for ext in AUDIO_EXTENSIONS)
+    return normalize_title(file_title).lower().endswith(AUDIO_EXTENSIONS)
 
 
-def tokenize(value: str) -> List[str]:
-    return re.findall(r"[a-z0-9]+", value.lower())
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def tokenize(value: str) -> Tuple[str, ...]:
+    return tuple(TOKEN_RE.findall(value.lower()))
 
 
-def score_audio_candidate(file_title: str, wiki_title: str, scientific_name: str) -> int:
+def score_audio_candidate(
+    file_title: str,
+    title_tokens: Set[str],
+    scientific_tokens: Set[str],
+) -> int:
     name = normalize_title(file_title).lower()
     score = 0
-    if any(keyword in name for keyword in PREFERRED_AUDIO_KEYWORDS):
+    if PREFERRED_AUDIO_RE.search(name):
         score += 5
-    if any(keyword in name for keyword in DEPRIORITIZE_AUDIO_KEYWORDS):
+    if DEPRIORITIZE_AUDIO_RE.search(name):
         score -= 5
 
-    title_tokens = set(tokenize(wiki_title))
-    scientific_tokens = set(tokenize(scientific_name))
     name_tokens = set(tokenize(name))
     score += len(title_tokens & name_tokens)
     score += len(scientific_tokens & name_tokens)
 
-    if name.endswith(".ogg") or name.endswith(".oga") or name.endswith(".opus"):
+    if name.endswith(PREFERRED_AUDIO_EXTENSIONS):
         score += 1
     return score
 
 
-def list_page_file_titles(s: requests.Session, wiki_title: str) -> List[str]:
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def track_normalized_titles(query: dict, aliases: Dict[str, List[str]]) -> None:
+    for item in query.get("normalized", []):
+        source, target = item.get("from"), item.get("to")
+        if source in aliases and target and source not in aliases.get(target, []):
+            aliases.setdefault(target, []).append(source)
+
+
+def page_file_titles(page: dict) -> List[str]:
     out: List[str] = []
-    imcontinue: Optional[str] = None
+    for image in page.get("images", []):
+        file_title = image.get("title")
+        if isinstance(file_title, str) and file_title:
+            out.append(file_title)
+    return out
+
+
+def list_page_file_titles_if_changed(
+    s: requests.Session,
+    wiki_title: str,
+    etag: Optional[str],
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Single-title image listing sent with If-None-Match when an ETag is known.
+    Returns (None, etag) when the server answers 304 Not Modified, otherwise the
+    page's file titles and the response's ETag (if any).
+    """
+    response = _get(
+        s,
+        ENWIKI_API,
+        params={**PAGE_IMAGES_PARAMS, "titles": wiki_title},
+        headers={"If-None-Match": etag} if etag else None,
+    )
+    if response.status_code == 304:
+        return None, etag
+
+    new_etag = response.headers.get("ETag")
+    payload = response.json()
+    if payload.get("continue", {}).get("imcontinue"):
+        # Rare pages with more images than one response holds: fetch the full list.
+        return list_page_file_titles_batch(s, [wiki_title])[wiki_title], new_etag
+
+    out: List[str] = []
+    for page in payload.get("query", {}).get("pages", {}).values():
+        out.extend(page_file_titles(page))
+    return out, new_etag
+
+
+def list_page_file_titles_batch(s: requests.Session, wiki_titles: List[str]) -> Dict[str, List[str]]:
+    out: Dict[str, List[str]] = {title: [] for title in wiki_titles}
+    # The API reports pages under their normalized titles; map those back to ours.
+    aliases: Dict[str, List[str]] = {title: [title] for title in wiki_titles}
+    params = {**PAGE_IMAGES_PARAMS, "titles": "|".join(wiki_titles)}
+    cont: Dict[str, str] = {}
 
     while True:
-        params = {
-            "action": "query",
-            "titles": wiki_title,
-            "prop": "images",
-            "imlimit": "max",
-            "format": "json",
-        }
-        if imcontinue:
-            params["imcontinue"] = imcontinue
-        payload = _get_json(s, ENWIKI_API, params=params)
-
-        pages = payload.get("query", {}).get("pages", {})
-        for page in pages.values():
-            for image in page.get("images", []):
-                title = image.get("title")
-                if isinstance(title, str) and title:
-                    out.append(title)
+        payload = _get_json(s, ENWIKI_API, params={**params, **cont})
+        query = payload.get("query", {})
+        track_normalized_titles(query, aliases)
+
+        for page in query.get("pages", {}).values():
+            file_titles = page_file_titles(page)
+            for title in aliases.get(page.get("title"), []):
+                out[title].extend(file_titles)
 
         cont = payload.get("continue", {})
-        imcontinue = cont.get("imcontinue")
-        if not imcontinue:
+        if not cont.get("imcontinue"):
             break
 
     return out
@@ -176,39 +286,39 @@ def best_audio_file_title(
     scientific_name: str,
 ) -> str:
     audio_files = [title for title in file_titles if is_audio_filename(title)]
-    if not audio_files:
-        return ""
-    audio_files.sort(
-        key=lambda candidate: score_audio_candidate(candidate, wiki_title, scientific_name),
-        reverse=True,
-    )
-    return audio_files[0]
-
+    if len(audio_files) <= 1:
+        return audio_files[0] if audio_files else ""
 
-def resolve_audio_file_url(
-    s: requests.Session,
-    file_title: str,
-    file_url_cache: Dict[str, str],
-) -> str:
-    normalized_file_title = normalize_file_title(file_title)
-    if not normalized_file_title:
-        return ""
+    title_tokens = set(tokenize(wiki_title))
+    scientific_tokens = set(tokenize(scientific_name))
+    # max() keeps the first of equally scored files, like the stable sort it replaces.
+    return max(
+        audio_files,
+        key=lambda candidate: score_audio_candidate(candidate, title_tokens, scientific_tokens),
+    )
 
-    if normalized_file_title in file_url_cache:
-        return file_url_cache[normalized_file_title]
 
-    params = {
-        "action": "query",
-        "titles": normalized_file_title,
-        "prop": "imageinfo",
-        "iiprop": "url|mime",
-        "format": "json",
-    }
+def resolve_audio_file_urls_batch(s: requests.Session, file_titles: List[str]) -> Dict[str, str]:
+    """
+    Resolves normalized "File:..." titles to their audio URLs, checking Commons first and
+    English Wikipedia for anything Commons does not have. Unresolved titles map to "".
+    """
+    out: Dict[str, str] = {title: "" for title in file_titles}
+    residual = list(file_titles)
 
     for api in (COMMONS_API, ENWIKI_API):
-        payload = _get_json(s, api, params=params)
-        pages = payload.get("query", {}).get("pages", {})
-        for page in pages.values():
+        if not residual:
+            break
+        aliases: Dict[str, List[str]] = {title: [title] for title in residual}
+        payload = _get_json(
+            s,
+            api,
+            params={**AUDIO_INFO_PARAMS, "titles": "|".join(residual)},
+        )
+        query = payload.get("query", {})
+        track_normalized_titles(query, aliases)
+
+        for page in query.get("pages", {}).values():
             if "missing" in page:
                 continue
             image_info = page.get("imageinfo") or []
@@ -217,40 +327,201 @@ def resolve_audio_file_url(
             info = image_info[0]
             url = info.get("url") or ""
             mime = (info.get("mime") or "").lower()
-            if url and (mime.startswith("audio/") or is_audio_filename(normalized_file_title)):
-                file_url_cache[normalized_file_title] = url
-                return url
+            for title in aliases.get(page.get("title"), []):
+                if url and (mime.startswith("audio/") or is_audio_filename(title)):
+                    out[title] = url
 
-    file_url_cache[normalized_file_title] = ""
-    return ""
+        residual = [title for title in residual if not out[title]]
 
+    return out
 
-def find_sound_url_for_page(
-    s: requests.Session,
-    wiki_title: str,
-    scientific_name: str,
-    page_cache: Dict[str, str],
-    file_url_cache: Dict[str, str],
-) -> str:
-    if wiki_title in page_cache:
-        return page_cache[wiki_title]
 
-    file_titles = list_page_file_titles(s, wiki_title)
-    audio_title = best_audio_file_title(file_titles, wiki_title, scientific_name)
-    if not audio_title:
-        page_cache[wiki_title] = ""
-        return ""
+def progress_due(done: int, step: int, every: int) -> bool:
+    # True when the last `step` rows crossed a multiple of `every`.
+    return every > 0 and done // every > (done - step) // every
+
 
-    sound_url = resolve_audio_file_url(s, audio_title, file_url_cache)
-    page_cache[wiki_title] = sound_url
-    return sound_url
+class SoundCache:
+    """
+    SQLite store of wiki title -> sound URL ("page") and file title -> URL ("file")
+    lookups, so reruns skip anything already resolved. Blank URLs are cached too.
+    Pages also keep the ETag of their last single-title lookup, if any, so blank
+    pages can be rechecked with a conditional request.
+    """
+
+    TABLES = ("page", "file")
+    # Stay well under SQLite's limit on bound parameters per statement.
+    MAX_PARAMS = 500
+
+    def __init__(self, path: Path) -> None:
+        self.conn = sqlite3.connect(str(path))
+        with self.conn:
+            for table in self.TABLES:
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (title TEXT PRIMARY KEY, url TEXT NOT NULL)"
+                )
+            page_columns = {row[1] for row in self.conn.execute("PRAGMA table_info(page)")}
+            if "etag" not in page_columns:
+                self.conn.execute("ALTER TABLE page ADD COLUMN etag TEXT")
+
+    def get_many(self, table: str, titles: Iterable[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        for batch in chunked(titles, self.MAX_PARAMS):
+            placeholders = ",".join("?" * len(batch))
+            out.update(
+                self.conn.execute(
+                    f"SELECT title, url FROM {table} WHERE title IN ({placeholders})",
+                    batch,
+                )
+            )
+        return out
+
+    def get_page_etags(self, titles: Iterable[str]) -> Dict[str, Optional[str]]:
+        out: Dict[str, Optional[str]] = {}
+        for batch in chunked(titles, self.MAX_PARAMS):
+            placeholders = ",".join("?" * len(batch))
+            out.update(
+                self.conn.execute(
+                    f"SELECT title, etag FROM page WHERE title IN ({placeholders})",
+                    batch,
+                )
+            )
+        return out
+
+    def put_many(self, table: str, urls: Dict[str, str]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (title, url) VALUES (?, ?)",
+                urls.items(),
+            )
+
+    def put_pages(self, urls: Dict[str, str], etags: Dict[str, Optional[str]]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO page (title, url, etag) VALUES (?, ?, ?)",
+                ((title, url, etags.get(title)) for title, url in urls.items()),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
 
 
 def default_paths():
     script_dir = Path(__file__).resolve().parent
     mammals_path = script_dir.parent / "mammals2026.csv"
     output_path = mammals_path.with_name(f"{mammals_path.stem}{DEFAULT_OUTPUT_SUFFIX}{mammals_path.suffix}")
-    return mammals_path, output_path
+    cache_path = script_dir / DEFAULT_CACHE_NAME
+    return mammals_path, output_path, cache_path
+
+
+def lookup_sound_urls(
+    s: requests.Session,
+    executor: ThreadPoolExecutor,
+    jobs: Dict[str, str],
+    page_cache: Dict[str, str],
+    file_url_cache: Dict[str, str],
+    cache: Optional[SoundCache] = None,
+    read_cache: bool = True,
+    recheck_blank: bool = False,
+) -> Set[str]:
+    """
+    Resolves a sound URL into `page_cache` for each wiki title in `jobs`
+    (title -> scientific name) using batched API queries run on `executor`.
+    Results are read from and written back to `cache` when given; `read_cache=False`
+    refetches but still writes. With `recheck_blank`, pages cached without a sound
+    are not trusted: those with an ETag are revalidated one by one with conditional
+    requests, the others are refetched in batches.
+    Returns the wiki titles whose lookup failed.
+    """
+    jobs = {title: name for title, name in jobs.items() if title not in page_cache}
+    recheck: Dict[str, Optional[str]] = {}
+    if cache is not None and read_cache:
+        cached_pages = cache.get_many("page", jobs)
+        if recheck_blank:
+            # Blanks with a stored ETag get a conditional request; the rest are simply
+            # refetched with the batched jobs.
+            etags = cache.get_page_etags(title for title, url in cached_pages.items() if not url)
+            recheck = {title: etag for title, etag in etags.items() if etag}
+            cached_pages = {title: url for title, url in cached_pages.items() if url}
+        page_cache.update(cached_pages)
+        jobs = {title: name for title, name in jobs.items() if title not in page_cache}
+
+    failed_titles: Set[str] = set()
+    file_titles_by_page: Dict[str, List[str]] = {}
+    page_etags: Dict[str, Optional[str]] = {}
+    # ETags are per title, so blank pages with one are rechecked individually.
+    recheck_futures = {
+        executor.submit(list_page_file_titles_if_changed, s, title, etag): title
+        for title, etag in recheck.items()
+    }
+    batch_futures = {
+        executor.submit(list_page_file_titles_batch, s, batch): batch
+        for batch in chunked((title for title in jobs if title not in recheck), MAX_TITLES_PER_QUERY)
+    }
+    for future in as_completed(recheck_futures):
+        wiki_title = recheck_futures[future]
+        try:
+            file_titles, page_etags[wiki_title] = future.result()
+        except Exception:
+            failed_titles.add(wiki_title)
+            continue
+        if file_titles is None:
+            # Not modified since it was cached blank.
+            page_cache[wiki_title] = ""
+        else:
+            file_titles_by_page[wiki_title] = file_titles
+    jobs = {title: name for title, name in jobs.items() if title not in page_cache}
+
+    for future in as_completed(batch_futures):
+        try:
+            file_titles_by_page.update(future.result())
+        except Exception:
+            failed_titles.update(batch_futures[future])
+
+    audio_title_by_page: Dict[str, str] = {}
+    for wiki_title, scientific_name in jobs.items():
+        if wiki_title in failed_titles:
+            continue
+        audio_title = best_audio_file_title(
+            file_titles_by_page[wiki_title], wiki_title, scientific_name
+        )
+        audio_title_by_page[wiki_title] = normalize_file_title(audio_title)
+
+    audio_titles = sorted(
+        {title for title in audio_title_by_page.values() if title and title not in file_url_cache}
+    )
+    if cache is not None and read_cache:
+        cached_files = cache.get_many("file", audio_titles)
+        if recheck_blank:
+            cached_files = {title: url for title, url in cached_files.items() if url}
+        file_url_cache.update(cached_files)
+        audio_titles = [title for title in audio_titles if title not in file_url_cache]
+
+    failed_files: Set[str] = set()
+    batch_futures = {
+        executor.submit(resolve_audio_file_urls_batch, s, batch): batch
+        for batch in chunked(audio_titles, MAX_TITLES_PER_QUERY)
+    }
+    for future in as_completed(batch_futures):
+        try:
+            urls = future.result()
+        except Exception:
+            failed_files.update(batch_futures[future])
+            continue
+        file_url_cache.update(urls)
+        if cache is not None:
+            cache.put_many("file", urls)
+
+    fetched_pages: Dict[str, str] = {}
+    for wiki_title, audio_title in audio_title_by_page.items():
+        if audio_title in failed_files:
+            failed_titles.add(wiki_title)
+        else:
+            fetched_pages[wiki_title] = file_url_cache.get(audio_title, "")
+    if cache is not None:
+        cache.put_pages(fetched_pages, page_etags)
+    page_cache.update(fetched_pages)
+    return failed_titles
 
 
 def add_sound_column(
@@ -259,12 +530,14 @@ def add_sound_column(
     column_name: str,
     force_refresh: bool,
     progress_every: int,
+    workers: int,
+    cache_path: Optional[Path] = None,
+    recheck_blank: bool = False,
 ) -> dict:
-    s = session()
+    s = session(pool_size=max(1, workers))
 
     page_cache: Dict[str, str] = {}
     file_url_cache: Dict[str, str] = {}
-    rows = []
     stats = {
         "total": 0,
         "filled": 0,
@@ -274,66 +547,104 @@ def add_sound_column(
         "errors": 0,
     }
 
-    with mammals_path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        if not fieldnames:
-            raise ValueError(f"No header found in {mammals_path}")
-        if column_name not in fieldnames:
-            fieldnames = [*fieldnames, column_name]
-
-        for idx, row in enumerate(reader, start=1):
-            stats["total"] += 1
-            existing = (row.get(column_name) or "").strip()
-            if existing and not force_refresh:
-                stats["already_had_value"] += 1
-                rows.append(row)
-                continue
-
-            wiki_title = wikipedia_title_from_row(row)
-            if not wiki_title:
-                row[column_name] = ""
-                stats["missing_title"] += 1
-                stats["left_blank"] += 1
-                rows.append(row)
-                continue
-
-            try:
-                sound_url = find_sound_url_for_page(
-                    s=s,
-                    wiki_title=wiki_title,
-                    scientific_name=row.get("scientific_name", ""),
-                    page_cache=page_cache,
-                    file_url_cache=file_url_cache,
-                )
-            except Exception:
-                sound_url = ""
-                stats["errors"] += 1
-
-            row[column_name] = sound_url
-            if sound_url:
-                stats["filled"] += 1
+    # Rows are written as each chunk is resolved; the temp file is swapped in at the
+    # end so the output can safely be the input file.
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    workers = max(1, workers)
+    # Rows read, resolved and written per step; enough titles to keep every worker busy.
+    rows_per_chunk = MAX_TITLES_PER_QUERY * workers
+    cache = SoundCache(cache_path) if cache_path else None
+    try:
+        with mammals_path.open("r", newline="", encoding="utf-8") as f, tmp_path.open(
+            "w", newline="", encoding="utf-8"
+        ) as out_f, ThreadPoolExecutor(max_workers=workers) as executor:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                raise ValueError(f"No header found in {mammals_path}")
+            if column_name in header:
+                out_header = header
+                sound_idx = header.index(column_name)
             else:
-                stats["left_blank"] += 1
-            rows.append(row)
-
-            if progress_every > 0 and idx % progress_every == 0:
-                print(
-                    f"Processed {idx} rows. "
-                    f"Filled={stats['filled']}, blanks={stats['left_blank']}, "
-                    f"errors={stats['errors']}."
+                out_header = [*header, column_name]
+                sound_idx = len(header)
+            width = len(out_header)
+            title_idx = column_index(header, "wikipedia_title")
+            source_idx = column_index(header, "source_url")
+            sci_idx = column_index(header, "scientific_name")
+            writer = csv.writer(out_f)
+            writer.writerow(out_header)
+
+            for rows in chunked((row for row in reader if row), rows_per_chunk):
+                # Rows that need a lookup, paired with their Wikipedia title.
+                pending: List[Tuple[List[str], str]] = []
+                # One lookup per distinct page: wiki title -> scientific name of first row using it.
+                jobs: Dict[str, str] = {}
+                for row in rows:
+                    stats["total"] += 1
+                    if len(row) < width:
+                        row.extend([""] * (width - len(row)))
+                    existing = row[sound_idx].strip()
+                    if existing and not force_refresh:
+                        stats["already_had_value"] += 1
+                        continue
+
+                    wiki_title = wikipedia_title_from_fields(
+                        row[title_idx] if title_idx is not None else "",
+                        row[source_idx] if source_idx is not None else "",
+                    )
+                    if not wiki_title:
+                        row[sound_idx] = ""
+                        stats["missing_title"] += 1
+                        stats["left_blank"] += 1
+                        continue
+
+                    pending.append((row, wiki_title))
+                    jobs.setdefault(wiki_title, row[sci_idx] if sci_idx is not None else "")
+
+                failed_titles = lookup_sound_urls(
+                    s,
+                    executor,
+                    jobs,
+                    page_cache,
+                    file_url_cache,
+                    cache=cache,
+                    read_cache=not force_refresh,
+                    recheck_blank=recheck_blank,
                 )
 
-    with output_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
+                for row, wiki_title in pending:
+                    if wiki_title in failed_titles:
+                        sound_url = ""
+                        stats["errors"] += 1
+                    else:
+                        sound_url = page_cache.get(wiki_title, "")
+
+                    row[sound_idx] = sound_url
+                    if sound_url:
+                        stats["filled"] += 1
+                    else:
+                        stats["left_blank"] += 1
+
+                writer.writerows(rows)
+                out_f.flush()
+
+                if progress_due(stats["total"], len(rows), progress_every):
+                    print(
+                        f"Processed {stats['total']} rows. "
+                        f"Filled={stats['filled']}, blanks={stats['left_blank']}, "
+                        f"errors={stats['errors']}."
+                    )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    tmp_path.replace(output_path)
     return stats
 
 
 def main() -> None:
-    default_mammals_path, default_output_path = default_paths()
+    default_mammals_path, default_output_path, default_cache_path = default_paths()
 
     parser = argparse.ArgumentParser(
         description=(
@@ -359,18 +670,45 @@ def main() -> None:
     parser.add_argument(
         "--force-refresh",
         action="store_true",
-        help="Recompute sound URL even when column already has a value.",
+        help="Recompute sound URL even when column already has a value, bypassing the cache.",
     )
     parser.add_argument(
         "--progress-every",
         type=int,
         default=25,
-        help="Print progress every N rows (default: 25, 0 to disable).",
+        help=(
+            "Print progress after each written chunk of rows that crosses a multiple of N "
+            "(default: 25, 0 to disable). Chunks hold 50 rows per worker, so progress "
+            "prints at most once per chunk."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent Wikipedia lookups (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=str(default_cache_path),
+        help=(
+            "SQLite cache of resolved pages and files, reused across runs "
+            f"(default: {default_cache_path}; pass '' to disable)."
+        ),
+    )
+    parser.add_argument(
+        "--recheck-blank",
+        action="store_true",
+        help=(
+            "Revalidate pages cached without a sound using conditional (ETag) requests "
+            "instead of trusting the cached blank."
+        ),
     )
     args = parser.parse_args()
 
     mammals_path = Path(args.mammals)
     output_path = Path(args.output)
+    cache_path = Path(args.cache_path) if args.cache_path else None
 
     stats = add_sound_column(
         mammals_path=mammals_path,
@@ -378,6 +716,9 @@ def main() -> None:
         column_name=args.column_name,
         force_refresh=args.force_refresh,
         progress_every=max(0, args.progress_every),
+        workers=max(1, args.workers),
+        cache_path=cache_path,
+        recheck_blank=args.recheck_blank,
     )
 
     print(f"Rows read: {stats['total']}")
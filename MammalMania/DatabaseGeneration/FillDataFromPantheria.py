@@ -1,9 +1,12 @@
 import argparse
 import csv
+import pickle
+from functools import lru_cache
 from pathlib import Path
 
 
 MISSING_SENTINEL = -999.0
+INDEX_CACHE_SUFFIX = ".traits.pkl"
 
 PANTHERIA_TO_TARGET = {
     "5-1_AdultBodyMass_g": "mass_kg",
@@ -14,14 +17,18 @@ PANTHERIA_TO_TARGET = {
 
 
 def normalize_name(value: str) -> str:
-    return " ".join((value or "").strip().lower().split())
+    # str.split() with no separator already drops leading/trailing whitespace.
+    if not value:
+        return ""
+    return " ".join(value.lower().split())
 
 
 def to_binomial(normalized_name: str) -> str:
-    parts = normalized_name.split()
-    if len(parts) >= 2:
-        return f"{parts[0]} {parts[1]}"
-    return normalized_name
+    genus, sep, rest = normalized_name.partition(" ")
+    if not sep:
+        return normalized_name
+    species = rest.partition(" ")[0]
+    return f"{genus} {species}"
 
 
 def parse_pantheria_number(raw: str):
@@ -40,44 +47,97 @@ def parse_pantheria_number(raw: str):
 
 
 def format_number(value: float, decimals: int) -> str:
-    text = f"{value:.{decimals}f}"
+    # printf-style formatting skips parsing a nested f-string format spec per call.
+    text = "%.*f" % (decimals, value)
     if "." in text:
         text = text.rstrip("0").rstrip(".")
     return text
 
 
-def convert_trait(source_column: str, value: float):
-    if value is None:
-        return None
-    if source_column == "5-1_AdultBodyMass_g":
-        mass_kg = value / 1000.0
-        if mass_kg < 1:
-            return format_number(mass_kg, 3)
-        return format_number(mass_kg, 1)
-    if source_column == "9-1_GestationLen_d":
-        return format_number(value, 1)
-    if source_column == "15-1_LitterSize":
-        if abs(value - round(value)) < 1e-9:
-            return str(int(round(value)))
-        return format_number(value, 2)
-    if source_column == "17-1_MaxLongevity_m":
-        return format_number(value / 12.0, 1)
-    return None
+# PanTHERIA traits repeat heavily (a few hundred distinct values per column),
+# so each converter formats a given value once and reuses the result.
+@lru_cache(maxsize=None)
+def convert_body_mass(value: float) -> str:
+    mass_kg = value / 1000.0
+    if mass_kg < 1:
+        return format_number(mass_kg, 3)
+    return format_number(mass_kg, 1)
 
 
-def load_pantheria_index(path: Path):
+@lru_cache(maxsize=None)
+def convert_gestation(value: float) -> str:
+    return format_number(value, 1)
+
+
+@lru_cache(maxsize=None)
+def convert_litter_size(value: float) -> str:
+    rounded = round(value)
+    if abs(value - rounded) < 1e-9:
+        return str(int(rounded))
+    return format_number(value, 2)
+
+
+@lru_cache(maxsize=None)
+def convert_longevity(value: float) -> str:
+    return format_number(value / 12.0, 1)
+
+
+TRAIT_CONVERTERS = {
+    "5-1_AdultBodyMass_g": convert_body_mass,
+    "9-1_GestationLen_d": convert_gestation,
+    "15-1_LitterSize": convert_litter_size,
+    "17-1_MaxLongevity_m": convert_longevity,
+}
+# (target column, converter) in PANTHERIA_TO_TARGET order, matching the index tuples.
+TRAIT_CONVERSIONS = tuple(
+    (target, TRAIT_CONVERTERS[source]) for source, target in PANTHERIA_TO_TARGET.items()
+)
+
+
+def build_pantheria_index(path: Path):
     index = {}
     with path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter="\t")
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"No header found in {path}")
+        name_idx = header.index("MSW05_Binomial")
+        value_idxs = [header.index(col) for col in PANTHERIA_TO_TARGET]
+        width = len(header)
+
         for row in reader:
-            key = normalize_name(row.get("MSW05_Binomial", ""))
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            # Keys are always binomials, so each mammal needs exactly one lookup.
+            key = to_binomial(normalize_name(row[name_idx]))
             if key and key not in index:
-                index[key] = row
+                index[key] = tuple(parse_pantheria_number(row[i]) for i in value_idxs)
     return index
 
 
-def fill_and_filter_mammals(mammals_path: Path, pantheria_index):
-    kept_rows = []
+def load_pantheria_index(path: Path):
+    # The parsed index is pickled beside the TSV and reused until the TSV changes.
+    cache_path = path.with_name(path.name + INDEX_CACHE_SUFFIX)
+    stat = path.stat()
+    cache_key = (stat.st_mtime_ns, stat.st_size, list(PANTHERIA_TO_TARGET))
+    try:
+        with cache_path.open("rb") as f:
+            cached_key, index = pickle.load(f)
+        if cached_key == cache_key:
+            return index
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    index = build_pantheria_index(path)
+    try:
+        with cache_path.open("wb") as f:
+            pickle.dump((cache_key, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return index
+
+
+def fill_and_filter_mammals(mammals_path: Path, pantheria_index, output_path: Path):
     stats = {
         "total": 0,
         "dropped_no_match": 0,
@@ -85,48 +145,59 @@ def fill_and_filter_mammals(mammals_path: Path, pantheria_index):
         "kept": 0,
     }
 
-    with mammals_path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        if not fieldnames:
+    # Kept rows are written as they are produced; the temp file is swapped in at the
+    # end because the output defaults to the input file.
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with mammals_path.open("r", newline="", encoding="utf-8") as f, tmp_path.open(
+        "w", newline="", encoding="utf-8"
+    ) as out_f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
             raise ValueError(f"No header found in {mammals_path}")
 
+        sci_idx = header.index("scientific_name") if "scientific_name" in header else None
+        out_header = list(header)
+        for target_col in PANTHERIA_TO_TARGET.values():
+            if target_col not in out_header:
+                out_header.append(target_col)
+        conversions = tuple(
+            (out_header.index(target_col), convert) for target_col, convert in TRAIT_CONVERSIONS
+        )
+        width = len(out_header)
+        writer = csv.writer(out_f)
+        writer.writerow(out_header)
+
         for mammal_row in reader:
+            if not mammal_row:
+                continue
+            if len(mammal_row) < width:
+                mammal_row.extend([""] * (width - len(mammal_row)))
             stats["total"] += 1
-            sci_name = normalize_name(mammal_row.get("scientific_name", ""))
-            pantheria_row = pantheria_index.get(sci_name)
-            if pantheria_row is None:
-                pantheria_row = pantheria_index.get(to_binomial(sci_name))
+            sci_name = (
+                to_binomial(normalize_name(mammal_row[sci_idx])) if sci_idx is not None else ""
+            )
+            pantheria_values = pantheria_index.get(sci_name)
 
-            if pantheria_row is None:
+            if pantheria_values is None:
                 stats["dropped_no_match"] += 1
                 continue
 
             mapped_count = 0
-            for source_col, target_col in PANTHERIA_TO_TARGET.items():
-                source_value = parse_pantheria_number(pantheria_row.get(source_col))
-                converted = convert_trait(source_col, source_value)
-                if converted is not None:
+            for (target_idx, convert), source_value in zip(conversions, pantheria_values):
+                if source_value is not None:
+                    mammal_row[target_idx] = convert(source_value)
                     mapped_count += 1
-                    mammal_row[target_col] = converted
-                else:
-                    mammal_row[target_col] = mammal_row.get(target_col, "")
 
             if mapped_count < 2:
                 stats["dropped_too_sparse"] += 1
                 continue
 
-            kept_rows.append(mammal_row)
-
-        stats["kept"] = len(kept_rows)
-    return fieldnames, kept_rows, stats
-
+            writer.writerow(mammal_row)
+            stats["kept"] += 1
 
-def write_csv(path: Path, fieldnames, rows):
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    tmp_path.replace(output_path)
+    return stats
 
 
 def main():
@@ -158,8 +229,7 @@ def main():
     output_path = Path(args.output) if args.output else mammals_path
 
     pantheria_index = load_pantheria_index(pantheria_path)
-    fieldnames, rows, stats = fill_and_filter_mammals(mammals_path, pantheria_index)
-    write_csv(output_path, fieldnames, rows)
+    stats = fill_and_filter_mammals(mammals_path, pantheria_index, output_path)
 
     print(f"PanTHERIA species indexed: {len(pantheria_index)}")
     print(f"Total mammals read: {stats['total']}")
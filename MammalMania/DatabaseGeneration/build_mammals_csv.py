@@ -3,16 +3,26 @@ from __future__ import annotations
 
 import argparse
 import csv
+import gzip
+import hashlib
+import json
 import random
 import re
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import quote, unquote, urlparse
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote, urlencode, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 WIKIDATA_SPARQL = "https://query.wikidata.org/sparql"
 WIKIDATA_API = "https://www.wikidata.org/w/api.php"
@@ -61,7 +71,7 @@ KMH_TO_MPH = Decimal("0.621371192237334")
 MPS_TO_MPH = Decimal("2.2369362920544")
 KNOT_TO_MPH = Decimal("1.15077944802354")
 
-MAP_LIKE_IMAGE_KEYWORDS = {
+MAP_LIKE_IMAGE_KEYWORDS = frozenset({
     "area",
     "distribution",
     "locator",
@@ -69,9 +79,45 @@ MAP_LIKE_IMAGE_KEYWORDS = {
     "map",
     "range",
     "territory",
+})
+
+# Successful GET responses are cached on disk so reruns (and reseeds) skip the network.
+DEFAULT_CACHE_NAME = ".mammals_http_cache.sqlite3"
+CACHE_TTL = timedelta(days=7)
+
+# Requests per second allowed to each API host, shared by all worker threads.
+HOST_RATE_LIMITS = {
+    "query.wikidata.org": 5,
+    "www.wikidata.org": 30,
+    "en.wikipedia.org": 30,
+    "commons.wikimedia.org": 30,
+    "wikimedia.org": 100,
 }
 
-IMAGE_FILE_EXTENSIONS = {
+# Upper bound on the exponential part of the 429/503 backoff.
+MAX_BACKOFF_SECONDS = 60
+# Upper bound on server-requested waits (Retry-After / X-RateLimit-Reset), so a bogus
+# or far-future header can't stall a worker indefinitely.
+MAX_RETRY_AFTER_SECONDS = 300
+
+# "pageviews" costs one REST call per candidate (the API has no multi-article
+# endpoint); "sitelinks" reuses the Wikidata sitelink count from the candidate query.
+POPULARITY_SOURCES = ("pageviews", "sitelinks")
+
+# Disjoint sitelink ranges for the candidate queries, in each query's sort order.
+POPULAR_SITELINK_BUCKETS = ((100, None), (50, 99), (25, 49))
+OBSCURE_SITELINK_BUCKETS = ((2, 5), (6, 10), (11, 15), (16, 20))
+
+# wbgetentities accepts up to 50 ids per request.
+MAX_IDS_PER_QUERY = 50
+
+# Candidates are fetched concurrently, a chunk at a time, and consumed in pool order so
+# the output for a given seed does not depend on scheduling. A chunk's entities come
+# from a single wbgetentities call.
+DEFAULT_WORKERS = 8
+CANDIDATES_PER_CHUNK = MAX_IDS_PER_QUERY
+
+IMAGE_FILE_EXTENSIONS = frozenset({
     ".gif",
     ".jpeg",
     ".jpg",
@@ -79,7 +125,40 @@ IMAGE_FILE_EXTENSIONS = {
     ".tif",
     ".tiff",
     ".webp",
-}
+})
+# str.endswith takes a tuple, so the extension check is a single call.
+IMAGE_FILE_EXTENSION_SUFFIXES = tuple(sorted(IMAGE_FILE_EXTENSIONS))
+
+# A keyword counts only as a whole token, i.e. bounded by non-alphanumerics.
+MAP_LIKE_IMAGE_RE = re.compile(
+    r"(?:^|[^a-z0-9])(?:"
+    + "|".join(re.escape(keyword) for keyword in sorted(MAP_LIKE_IMAGE_KEYWORDS))
+    + r")(?:[^a-z0-9]|$)"
+)
+
+
+# (commons_file_page_url, direct_image_url, license_short, attribution)
+CommonsMetadata = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+FIELDNAMES = [
+    "wikidata_id",
+    "common_name",
+    "scientific_name",
+    "wikipedia_title",
+    "source_url",
+    "mass_kg",
+    "lifespan_yr",
+    "gestation_days",
+    "litter_size",
+    "max_speed_mph",
+    "conservation_status",
+    "pageviews_30d",
+    "image_url",
+    "image_file_page",
+    "image_license",
+    "image_attribution",
+]
 
 
 @dataclass(frozen=True)
@@ -90,21 +169,138 @@ class Candidate:
     sitelinks: int
 
 
-def session() -> requests.Session:
-    s = requests.Session()
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` requests per second, with bursts up to `rate`."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+RATE_LIMITERS = {host: RateLimiter(rate) for host, rate in HOST_RATE_LIMITS.items()}
+
+
+class JsonCache:
+    """
+    SQLite store of decoded JSON GET responses keyed by URL + params, gzipped, with a
+    time-to-live. Shared by the worker threads, so access is serialized with a lock.
+    """
+
+    def __init__(self, path: Path, ttl: timedelta = CACHE_TTL) -> None:
+        self.ttl_seconds = ttl.total_seconds()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS response (key TEXT PRIMARY KEY, fetched REAL NOT NULL, body BLOB NOT NULL)"
+            )
+
+    @staticmethod
+    def key(url: str, params: Optional[dict]) -> str:
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha1(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT fetched, body FROM response WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] < time.time() - self.ttl_seconds:
+            return None
+        return json.loads(gzip.decompress(row[1]))
+
+    def put(self, key: str, payload: dict) -> None:
+        body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO response (key, fetched, body) VALUES (?, ?, ?)",
+                (key, time.time(), body),
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class ApiSession(requests.Session):
+    """requests.Session that also carries the response cache _get_json reads and fills."""
+
+    def __init__(self, json_cache: Optional[JsonCache] = None) -> None:
+        super().__init__()
+        self.json_cache: Optional[JsonCache] = json_cache
+
+
+def session(json_cache: Optional[JsonCache] = None, pool_size: int = DEFAULT_WORKERS) -> ApiSession:
+    s = ApiSession(json_cache)
     s.headers.update({"User-Agent": USER_AGENT})
+    # Keep one alive connection per worker for each of the five API hosts; the default
+    # pool holds 10 per host, so more workers would keep reopening TLS connections.
+    s.mount("https://", HTTPAdapter(pool_connections=5, pool_maxsize=pool_size))
     return s
 
 
-def _get_json(s: requests.Session, url: str, *, params: Optional[dict] = None, timeout: int = 30) -> dict:
-    # Simple backoff for 429/503
+def retry_delay(r: requests.Response, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a 429/503: the server's Retry-After (seconds or
+    HTTP date) or X-RateLimit-Reset if given, capped at MAX_RETRY_AFTER_SECONDS, else
+    jittered exponential backoff so parallel workers don't retry in lockstep.
+    """
+    retry_after = r.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(MAX_RETRY_AFTER_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                wait = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                return min(MAX_RETRY_AFTER_SECONDS, max(0.0, wait))
+            except (TypeError, ValueError):
+                pass
+    reset = r.headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            value = float(reset)
+            # Either an epoch timestamp or a number of seconds from now.
+            wait = value - time.time() if value > 1e9 else value
+            return min(MAX_RETRY_AFTER_SECONDS, max(0.0, wait))
+        except ValueError:
+            pass
+    return min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.uniform(0, 1)
+
+
+def _get_json(s: ApiSession, url: str, *, params: Optional[dict] = None, timeout: int = 30) -> dict:
+    cache = s.json_cache
+    key = JsonCache.key(url, params) if cache is not None else ""
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    limiter = RATE_LIMITERS.get(urlparse(url).netloc)
+    # Backoff for 429/503
     for attempt in range(6):
+        if limiter is not None:
+            limiter.acquire()
         r = s.get(url, params=params, timeout=timeout)
         if r.status_code in (429, 503):
-            time.sleep(1.5 * (attempt + 1))
+            time.sleep(retry_delay(r, attempt))
             continue
         r.raise_for_status()
-        return r.json()
+        payload = r.json()
+        if cache is not None:
+            cache.put(key, payload)
+        return payload
     r.raise_for_status()
     return {}
 
@@ -127,29 +323,18 @@ def unit_qid_from_uri(unit_uri: str) -> Optional[str]:
 
 
 def pick_best_statements(statements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    preferred = [s for s in statements if s.get("rank") == "preferred"]
-    if preferred:
-        return preferred
-    normal = [s for s in statements if s.get("rank") == "normal"]
-    if normal:
-        return normal
-    return [s for s in statements if s.get("rank") != "deprecated"]
-
-
-def extract_quantity_claims(entity: Dict[str, Any], prop: str) -> List[Tuple[Decimal, Optional[str]]]:
-    claims = entity.get("claims", {})
-    statements = pick_best_statements(claims.get(prop, []))
-    out: List[Tuple[Decimal, Optional[str]]] = []
-    for st in statements:
-        dv = st.get("mainsnak", {}).get("datavalue", {}).get("value")
-        if not isinstance(dv, dict) or "amount" not in dv:
-            continue
-        try:
-            val = as_decimal(dv["amount"])
-        except Exception:
-            continue
-        out.append((val, unit_qid_from_uri(dv.get("unit", ""))))
-    return out
+    preferred: List[Dict[str, Any]] = []
+    normal: List[Dict[str, Any]] = []
+    other: List[Dict[str, Any]] = []
+    for s in statements:
+        rank = s.get("rank")
+        if rank == "preferred":
+            preferred.append(s)
+        elif rank == "normal":
+            normal.append(s)
+        elif rank != "deprecated":
+            other.append(s)
+    return preferred or normal or other
 
 
 def extract_item_claim_qids(entity: Dict[str, Any], prop: str) -> List[str]:
@@ -179,7 +364,7 @@ def extract_string_claims(entity: Dict[str, Any], prop: str) -> List[str]:
     return out
 
 
-def wikidata_label(s: requests.Session, qid: str, label_cache: Dict[str, Optional[str]]) -> Optional[str]:
+def wikidata_label(s: ApiSession, qid: str, label_cache: Dict[str, Optional[str]]) -> Optional[str]:
     if qid in label_cache:
         return label_cache[qid]
     try:
@@ -202,6 +387,33 @@ def wikidata_label(s: requests.Session, qid: str, label_cache: Dict[str, Optiona
         return None
 
 
+def wikidata_labels_batch(s: ApiSession, qids: List[str], label_cache: Dict[str, Optional[str]]) -> None:
+    """
+    Fills label_cache for all uncached qids, MAX_IDS_PER_QUERY per request. Ids from a
+    failed request stay uncached so wikidata_label can retry them individually.
+    """
+    pending = sorted({qid for qid in qids if qid not in label_cache})
+    for start in range(0, len(pending), MAX_IDS_PER_QUERY):
+        batch = pending[start : start + MAX_IDS_PER_QUERY]
+        try:
+            j = _get_json(
+                s,
+                WIKIDATA_API,
+                params={
+                    "action": "wbgetentities",
+                    "ids": "|".join(batch),
+                    "props": "labels",
+                    "languages": "en",
+                    "format": "json",
+                },
+            )
+        except Exception:
+            continue
+        entities = j.get("entities", {})
+        for qid in batch:
+            label_cache[qid] = entities.get(qid, {}).get("labels", {}).get("en", {}).get("value")
+
+
 def convert_mass_to_kg(value: Decimal, unit_qid: Optional[str]) -> Optional[Decimal]:
     if unit_qid == Q_KG:
         return value
@@ -249,49 +461,48 @@ def convert_speed_to_mph(value: Decimal, unit_qid: Optional[str]) -> Optional[De
     return None
 
 
-def best_mass_kg(entity: Dict[str, Any]) -> Optional[float]:
-    conv = []
-    for v, u in extract_quantity_claims(entity, P_MASS):
-        c = convert_mass_to_kg(v, u)
-        if c is not None:
-            conv.append(c)
-    return float(max(conv)) if conv else None
-
-
-def best_lifespan_yr(entity: Dict[str, Any]) -> Optional[float]:
-    conv = []
-    for v, u in extract_quantity_claims(entity, P_LIFESPAN):
-        c = convert_time_to_years(v, u)
-        if c is not None:
-            conv.append(c)
-    return float(max(conv)) if conv else None
+def convert_litter_size(value: Decimal, unit_qid: Optional[str]) -> Optional[Decimal]:
+    # litter size often unitless ("1")
+    return value if unit_qid is None else None
 
 
-def best_gestation_days(entity: Dict[str, Any]) -> Optional[float]:
-    conv = []
-    for v, u in extract_quantity_claims(entity, P_GESTATION):
-        c = convert_time_to_days(v, u)
-        if c is not None:
-            conv.append(c)
-    return float(max(conv)) if conv else None
+# Row field -> (property, converter); each field keeps the largest converted best-rank value.
+QUANTITY_FIELDS = (
+    ("mass_kg", P_MASS, convert_mass_to_kg),
+    ("lifespan_yr", P_LIFESPAN, convert_time_to_years),
+    ("gestation_days", P_GESTATION, convert_time_to_days),
+    ("litter_size", P_LITTER, convert_litter_size),
+    ("max_speed_mph", P_SPEED, convert_speed_to_mph),
+)
 
 
-def best_litter_size(entity: Dict[str, Any]) -> Optional[float]:
-    best: Optional[Decimal] = None
-    for v, u in extract_quantity_claims(entity, P_LITTER):
-        # litter size often unitless ("1")
-        if u is None:
-            best = v if best is None else max(best, v)
-    return float(best) if best is not None else None
-
+def extract_all(entity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reads everything the CSV needs from an entity's claims in one pass: the
+    QUANTITY_FIELDS values, "scientific_name" and "status_qids" (conservation status
+    items, best rank first).
+    """
+    claims = entity.get("claims", {})
+    out: Dict[str, Any] = {}
+    for field, prop, convert in QUANTITY_FIELDS:
+        best: Optional[Decimal] = None
+        for st in pick_best_statements(claims.get(prop, [])):
+            dv = st.get("mainsnak", {}).get("datavalue", {}).get("value")
+            if not isinstance(dv, dict) or "amount" not in dv:
+                continue
+            try:
+                val = as_decimal(dv["amount"])
+            except Exception:
+                continue
+            c = convert(val, unit_qid_from_uri(dv.get("unit", "")))
+            if c is not None and (best is None or c > best):
+                best = c
+        out[field] = float(best) if best is not None else None
 
-def best_speed_mph(entity: Dict[str, Any]) -> Optional[float]:
-    conv = []
-    for v, u in extract_quantity_claims(entity, P_SPEED):
-        c = convert_speed_to_mph(v, u)
-        if c is not None:
-            conv.append(c)
-    return float(max(conv)) if conv else None
+    names = extract_string_claims(entity, P_TAXON_NAME)
+    out["scientific_name"] = names[0] if names else None
+    out["status_qids"] = extract_item_claim_qids(entity, P_CONSERVATION_STATUS)
+    return out
 
 
 def normalize_conservation_status(label: str) -> str:
@@ -307,19 +518,14 @@ def is_usable_conservation_status(status: Optional[str]) -> bool:
     return not status.strip().casefold().startswith("data deficient")
 
 
-def best_conservation_status(entity: Dict[str, Any], s: requests.Session, label_cache: Dict[str, Optional[str]]) -> Optional[str]:
-    for qid in extract_item_claim_qids(entity, P_CONSERVATION_STATUS):
+def best_conservation_status(status_qids: List[str], s: ApiSession, label_cache: Dict[str, Optional[str]]) -> Optional[str]:
+    for qid in status_qids:
         label = wikidata_label(s, qid, label_cache)
         if label:
             return normalize_conservation_status(label)
     return None
 
 
-def best_scientific_name(entity: Dict[str, Any]) -> Optional[str]:
-    names = extract_string_claims(entity, P_TAXON_NAME)
-    return names[0] if names else None
-
-
 def wikipedia_url(title: str) -> str:
     return "https://en.wikipedia.org/wiki/" + quote(title.replace(" ", "_"), safe=":/()'%")
 
@@ -354,19 +560,18 @@ def filename_from_image_url(url: Optional[str]) -> Optional[str]:
 
 
 def has_supported_image_extension(filename: str) -> bool:
-    lower = filename.lower()
-    return any(lower.endswith(ext) for ext in IMAGE_FILE_EXTENSIONS)
+    return filename.lower().endswith(IMAGE_FILE_EXTENSION_SUFFIXES)
 
 
+# Lead filenames and URLs are checked more than once per candidate, so results are memoized.
+@lru_cache(maxsize=4096)
 def is_map_like_image_name_or_url(value: Optional[str]) -> bool:
     if not value:
         return False
-    text = unquote(value).lower()
-    tokens = re.split(r"[^a-z0-9]+", text)
-    return any(token in MAP_LIKE_IMAGE_KEYWORDS for token in tokens if token)
+    return MAP_LIKE_IMAGE_RE.search(unquote(value).lower()) is not None
 
 
-def page_image_filenames_from_enwiki(s: requests.Session, title: str) -> List[str]:
+def page_image_filenames_from_enwiki(s: ApiSession, title: str) -> List[str]:
     """
     Returns image filenames used by the page (without "File:" prefix), filtered to common
     raster image formats so we can seek non-map photos when the lead image is map-like.
@@ -384,22 +589,24 @@ def page_image_filenames_from_enwiki(s: requests.Session, title: str) -> List[st
         },
     )
     pages = j.get("query", {}).get("pages", {})
-    for _, page in pages.items():
-        out: List[str] = []
-        for img in page.get("images", []):
-            raw = img.get("title")
-            if not isinstance(raw, str):
-                continue
-            name = raw[5:] if raw.lower().startswith("file:") else raw
-            name = name.strip().replace(" ", "_")
-            if not name or not has_supported_image_extension(name):
-                continue
-            out.append(name)
-        return out
-    return []
+    # Only one title is queried, so there is at most one page.
+    page = next(iter(pages.values()), None)
+    if page is None:
+        return []
+    out: List[str] = []
+    for img in page.get("images", []):
+        raw = img.get("title")
+        if not isinstance(raw, str):
+            continue
+        name = raw[5:] if raw.lower().startswith("file:") else raw
+        name = name.strip().replace(" ", "_")
+        if not name or not has_supported_image_extension(name):
+            continue
+        out.append(name)
+    return out
 
 
-def sparql_candidates(s: requests.Session, *, limit: int, order: str, min_sitelinks: int, max_sitelinks: Optional[int] = None) -> List[Candidate]:
+def sparql_candidates(s: ApiSession, *, limit: int, order: str, min_sitelinks: int, max_sitelinks: Optional[int] = None) -> List[Candidate]:
     max_filter = f"FILTER(?sitelinks <= {max_sitelinks})" if max_sitelinks is not None else ""
     query = f"""
     SELECT ?item ?itemLabel ?title ?sitelinks WHERE {{
@@ -410,6 +617,9 @@ def sparql_candidates(s: requests.Session, *, limit: int, order: str, min_siteli
                schema:isPartOf <https://en.wikipedia.org/> ;
                schema:name ?title .
       ?item wikibase:sitelinks ?sitelinks .
+      # Species without any conservation status are always skipped, so drop them here
+      # rather than after their per-candidate lookups.
+      FILTER EXISTS {{ ?item wdt:{P_CONSERVATION_STATUS} ?status }}
       FILTER(?sitelinks >= {min_sitelinks})
       {max_filter}
       SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
@@ -431,22 +641,62 @@ def sparql_candidates(s: requests.Session, *, limit: int, order: str, min_siteli
     return out
 
 
-def wikidata_entity(s: requests.Session, qid: str) -> Dict[str, Any]:
-    j = _get_json(
-        s,
-        WIKIDATA_API,
-        params={
-            "action": "wbgetentities",
-            "ids": qid,
-            "props": "labels|claims",
-            "languages": "en",
-            "format": "json",
-        },
-    )
-    return j["entities"][qid]
+def sparql_candidates_bucketed(
+    s: ApiSession,
+    *,
+    limit: int,
+    order: str,
+    buckets: Tuple[Tuple[int, Optional[int]], ...],
+) -> List[Candidate]:
+    """
+    Same result as one sparql_candidates query over the union of the (min, max)
+    sitelink buckets, which must be disjoint and listed in `order`. The narrower
+    queries run concurrently and each stays well clear of the WDQS timeout.
+    """
+    with ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+        results = executor.map(
+            lambda bucket: sparql_candidates(s, limit=limit, order=order, min_sitelinks=bucket[0], max_sitelinks=bucket[1]),
+            buckets,
+        )
+        out: List[Candidate] = []
+        seen = set()
+        for candidates in results:
+            for cand in candidates:
+                if cand.qid not in seen:
+                    seen.add(cand.qid)
+                    out.append(cand)
+    return out[:limit]
 
 
-def lead_image_from_enwiki(s: requests.Session, title: str) -> Tuple[Optional[str], Optional[str]]:
+def wikidata_entities_batch(s: ApiSession, qids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns {qid: entity} for qids, MAX_IDS_PER_QUERY per request. Ids from a failed
+    request, or that Wikidata reports missing, are left out.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(qids), MAX_IDS_PER_QUERY):
+        batch = qids[start : start + MAX_IDS_PER_QUERY]
+        try:
+            j = _get_json(
+                s,
+                WIKIDATA_API,
+                params={
+                    "action": "wbgetentities",
+                    "ids": "|".join(batch),
+                    # Labels come from the SPARQL candidates; only the claims are read.
+                    "props": "claims",
+                    "format": "json",
+                },
+            )
+        except Exception:
+            continue
+        for qid, entity in j.get("entities", {}).items():
+            if "missing" not in entity:
+                out[qid] = entity
+    return out
+
+
+def lead_image_from_enwiki(s: ApiSession, title: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (image_url, filename) using PageImages: prop=pageimages piprop=original|name.
     filename is like "Lion_waiting_in_Namibia.jpg" (no "File:" prefix).
@@ -464,64 +714,91 @@ def lead_image_from_enwiki(s: requests.Session, title: str) -> Tuple[Optional[st
         },
     )
     pages = j.get("query", {}).get("pages", {})
-    for _, page in pages.items():
-        orig = page.get("original", {})
-        url = orig.get("source")
-        filename = page.get("pageimage") or filename_from_image_url(url)
-        return url, filename
-    return None, None
+    page = next(iter(pages.values()), None)
+    if page is None:
+        return None, None
+    url = page.get("original", {}).get("source")
+    filename = page.get("pageimage") or filename_from_image_url(url)
+    return url, filename
 
 
-def commons_metadata_for_filename(s: requests.Session, filename: str) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
-    """
-    Given "Foo bar.jpg", query Commons file page metadata.
-    Returns: (commons_file_page_url, direct_image_url, license_short, attribution)
-    If file isn't on Commons, returns (None, None, None, None).
-    """
+def commons_file_title(filename: str) -> str:
     normalized = unquote(filename.strip())
     if normalized.lower().startswith("file:"):
         normalized = normalized[5:]
-    title = "File:" + normalized.replace("_", " ")
-    j = _get_json(
-        s,
-        COMMONS_API,
-        params={
-            "action": "query",
-            "titles": title,
-            "prop": "imageinfo",
-            "iiprop": "url|extmetadata",
-            "format": "json",
-        },
-    )
-    pages = j.get("query", {}).get("pages", {})
-    for _, page in pages.items():
-        if "missing" in page:
-            return None, None, None, None
-        ii = (page.get("imageinfo") or [])
-        if not ii:
-            return None, None, None, None
-        info = ii[0]
-        ext = info.get("extmetadata", {}) or {}
-        license_short = (ext.get("LicenseShortName") or {}).get("value")
-        artist = (ext.get("Artist") or {}).get("value")
-        credit = (ext.get("Credit") or {}).get("value")
-
-        # crude but useful: a short attribution string
-        attribution = None
-        if artist and license_short:
-            attribution = f"{artist} / {license_short}"
-        elif credit and license_short:
-            attribution = f"{credit} / {license_short}"
-        elif license_short:
-            attribution = license_short
-
-        commons_file_page = "https://commons.wikimedia.org/wiki/" + quote(title.replace(" ", "_"))
-        return commons_file_page, info.get("url"), license_short, attribution
-
-    return None, None, None, None
-
-
-def pageviews_last_30d(s: requests.Session, title: str) -> Optional[int]:
+    return "File:" + normalized.replace("_", " ")
+
+
+def commons_metadata_from_page(title: str, page: Dict[str, Any]) -> Optional[CommonsMetadata]:
+    if "missing" in page:
+        return None
+    ii = (page.get("imageinfo") or [])
+    if not ii:
+        return None
+    info = ii[0]
+    ext = info.get("extmetadata", {}) or {}
+    license_short = (ext.get("LicenseShortName") or {}).get("value")
+    artist = (ext.get("Artist") or {}).get("value")
+    credit = (ext.get("Credit") or {}).get("value")
+
+    # crude but useful: a short attribution string
+    attribution = None
+    if artist and license_short:
+        attribution = f"{artist} / {license_short}"
+    elif credit and license_short:
+        attribution = f"{credit} / {license_short}"
+    elif license_short:
+        attribution = license_short
+
+    commons_file_page = "https://commons.wikimedia.org/wiki/" + quote(title.replace(" ", "_"))
+    return commons_file_page, info.get("url"), license_short, attribution
+
+
+def commons_metadata_batch(s: ApiSession, filenames: List[str]) -> Dict[str, CommonsMetadata]:
+    """
+    Given names like "Foo bar.jpg", query Commons file page metadata, MAX_IDS_PER_QUERY
+    titles per request. Returns {filename: (commons_file_page_url, direct_image_url,
+    license_short, attribution)}; files not on Commons, or from a failed request, are
+    left out.
+    """
+    names_by_title: Dict[str, List[str]] = {}
+    for filename in filenames:
+        names_by_title.setdefault(commons_file_title(filename), []).append(filename)
+    titles = list(names_by_title)
+
+    out: Dict[str, CommonsMetadata] = {}
+    for start in range(0, len(titles), MAX_IDS_PER_QUERY):
+        batch = titles[start : start + MAX_IDS_PER_QUERY]
+        try:
+            j = _get_json(
+                s,
+                COMMONS_API,
+                params={
+                    "action": "query",
+                    "titles": "|".join(batch),
+                    "prop": "imageinfo",
+                    "iiprop": "url|extmetadata",
+                    "format": "json",
+                },
+            )
+        except Exception:
+            continue
+        query = j.get("query", {})
+        # The API reports titles it rewrote (e.g. capitalized) under "normalized".
+        requested = {title: [title] for title in batch}
+        for item in query.get("normalized", []):
+            if item.get("from") in requested:
+                requested.setdefault(item.get("to"), []).extend(requested.pop(item["from"]))
+        for page in query.get("pages", {}).values():
+            for title in requested.get(page.get("title"), []):
+                metadata = commons_metadata_from_page(title, page)
+                if metadata is not None:
+                    for filename in names_by_title[title]:
+                        out[filename] = metadata
+    return out
+
+
+def pageviews_last_30d(s: ApiSession, title: str) -> Optional[int]:
     """
     Approx “per month” popularity: total views over last 30 completed days (ending yesterday UTC).
     Uses Pageviews API per-article endpoint.
@@ -543,175 +820,278 @@ def pageviews_last_30d(s: requests.Session, title: str) -> Optional[int]:
     return int(sum(i.get("views", 0) for i in items))
 
 
-def build_csv(count: int, seed: int, out_path: str) -> None:
+def reusable_images(
+    s: ApiSession, executor: ThreadPoolExecutor, titles: List[str]
+) -> Dict[str, Tuple[Optional[CommonsMetadata], bool]]:
+    """
+    Picks an image for each enwiki title: the lead image, kept ONLY if it resolves to a
+    Commons file (reusable), or when the lead looks like a map, the first other non-map
+    Commons image on the page. Returns {title: (metadata or None, map_only)}.
+    Page lookups run on executor; Commons metadata is fetched in batches.
+    """
+
+    def lead_filename(title: str) -> Optional[str]:
+        try:
+            return lead_image_from_enwiki(s, title)[1]
+        except Exception:
+            return None
+
+    leads = dict(zip(titles, executor.map(lead_filename, titles)))
+    metadata = commons_metadata_batch(s, [filename for filename in leads.values() if filename])
+
+    out: Dict[str, Tuple[Optional[CommonsMetadata], bool]] = {}
+    map_titles: List[str] = []
+    for title, filename in leads.items():
+        meta = metadata.get(filename) if filename else None
+        # If not on Commons, we leave blank to avoid accidentally using non-free enwiki-only files.
+        if meta is None or not (meta[0] and meta[1]):
+            out[title] = (None, False)
+            continue
+        out[title] = (meta, False)
+        # If the lead image appears to be a map/territory image, try to replace it
+        # with another non-map image used on the same page.
+        if is_map_like_image_name_or_url(filename) or is_map_like_image_name_or_url(meta[1]):
+            map_titles.append(title)
+    if not map_titles:
+        return out
+
+    def alternative_filenames(title: str) -> Optional[List[str]]:
+        try:
+            page_images = page_image_filenames_from_enwiki(s, title)
+        except Exception:
+            return None
+        return [
+            name for name in page_images
+            if name != leads[title] and not is_map_like_image_name_or_url(name)
+        ]
+
+    alternatives = dict(zip(map_titles, executor.map(alternative_filenames, map_titles)))
+    metadata.update(
+        commons_metadata_batch(
+            s,
+            [name for names in alternatives.values() if names for name in names if name not in metadata],
+        )
+    )
+    for title, names in alternatives.items():
+        if names is None:
+            # Page images could not be listed; keep the lead image.
+            continue
+        fallback = None
+        for name in names:
+            meta = metadata.get(name)
+            if meta and meta[0] and meta[1] and not is_map_like_image_name_or_url(meta[1]):
+                fallback = meta
+                break
+        out[title] = (fallback, fallback is None)
+    return out
+
+
+def pageviews_or_none(s: ApiSession, title: str) -> Optional[int]:
+    try:
+        return pageviews_last_30d(s, title)
+    except Exception:
+        return None
+
+
+def candidate_row(
+    cand: Candidate,
+    traits: Optional[Dict[str, Any]],
+    conservation_status: Optional[str],
+    views_30d: Optional[int],
+    image: Optional[CommonsMetadata],
+    map_only: bool,
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Builds the CSV row for one candidate from its extract_all traits, conservation
+    status, pageviews and image. Returns (row, outcome): outcome is "ok", "no_entity",
+    "status", "no_image" or "map_only", and row is None unless outcome is "ok".
+    """
+    if traits is None:
+        return None, "no_entity"
+    if not is_usable_conservation_status(conservation_status):
+        return None, "status"
+
+    image_file_page, image_url, image_license, image_attribution = image or (None, None, None, None)
+    if not image_url:
+        return None, "map_only" if map_only else "no_image"
+
+    return (
+        {
+            "wikidata_id": cand.qid,
+            "common_name": cand.label,
+            "scientific_name": traits["scientific_name"],
+            "wikipedia_title": cand.enwiki_title,
+            "source_url": wikipedia_url(cand.enwiki_title),
+
+            "mass_kg": traits["mass_kg"],
+            "lifespan_yr": traits["lifespan_yr"],
+            "gestation_days": traits["gestation_days"],
+            "litter_size": traits["litter_size"],
+            "max_speed_mph": traits["max_speed_mph"],
+            "conservation_status": conservation_status,
+
+            "pageviews_30d": views_30d,
+
+            "image_url": image_url,
+            "image_file_page": image_file_page,
+            "image_license": image_license,
+            "image_attribution": image_attribution,
+        },
+        "ok",
+    )
+
+
+def existing_wikidata_ids(out_path: str) -> Optional[Set[str]]:
+    """Returns the wikidata_id values already in out_path, or None if it is missing or empty."""
+    path = Path(out_path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "wikidata_id" not in header:
+            raise ValueError(f"Cannot resume: no wikidata_id column in {out_path}")
+        id_idx = header.index("wikidata_id")
+        return {row[id_idx] for row in reader if len(row) > id_idx and row[id_idx]}
+
+
+def build_csv(
+    count: int,
+    seed: int,
+    out_path: str,
+    workers: int = DEFAULT_WORKERS,
+    cache_path: Optional[Path] = None,
+    popularity_source: str = "pageviews",
+    resume: bool = False,
+) -> None:
+    json_cache = JsonCache(cache_path) if cache_path else None
+    try:
+        # The bucketed candidate queries also run side by side on the SPARQL host.
+        pool_size = max(workers, len(POPULAR_SITELINK_BUCKETS), len(OBSCURE_SITELINK_BUCKETS))
+        _build_csv(session(json_cache, pool_size), count, seed, out_path, workers, popularity_source, resume)
+    finally:
+        if json_cache is not None:
+            json_cache.close()
+
+
+def _build_csv(
+    s: ApiSession,
+    count: int,
+    seed: int,
+    out_path: str,
+    workers: int,
+    popularity_source: str,
+    resume: bool,
+) -> None:
     rnd = random.Random(seed)
-    s = session()
     label_cache: Dict[str, Optional[str]] = {}
 
     print(f"Starting mammal CSV build: count={count}, seed={seed}, out='{out_path}'")
 
+    existing = existing_wikidata_ids(out_path) if resume else None
+    if existing is not None:
+        print(f"Resuming: {len(existing)} rows already in {out_path}.")
+
     # Variety: popular + obscure
     print("Fetching popular mammal candidates from Wikidata...")
-    popular = sparql_candidates(s, limit=1200, order="DESC", min_sitelinks=25)
+    popular = sparql_candidates_bucketed(s, limit=1200, order="DESC", buckets=POPULAR_SITELINK_BUCKETS)
     print(f"Fetched {len(popular)} popular candidates.")
 
     print("Fetching obscure mammal candidates from Wikidata...")
-    obscure = sparql_candidates(s, limit=3500, order="ASC", min_sitelinks=2, max_sitelinks=20)
+    obscure = sparql_candidates_bucketed(s, limit=3500, order="ASC", buckets=OBSCURE_SITELINK_BUCKETS)
     print(f"Fetched {len(obscure)} obscure candidates.")
 
-    pool = rnd.sample(popular, k=min(len(popular), count * 3)) + rnd.sample(obscure, k=min(len(obscure), count * 3))
+    # Separate quotas keep the popular/obscure mix even; a single sample over both lists
+    # would be dominated by the (larger) obscure one.
+    pool = rnd.sample(popular, k=min(len(popular), count * 3))
+    pool.extend(rnd.sample(obscure, k=min(len(obscure), count * 3)))
     rnd.shuffle(pool)
     print(f"Candidate pool ready: {len(pool)} entries.")
 
-    seen = set()
-    rows: List[Dict[str, Any]] = []
+    seen = set(existing or ())
+    jobs: List[Tuple[int, Candidate]] = []
+    for idx, cand in enumerate(pool, start=1):
+        if cand.qid not in seen:
+            seen.add(cand.qid)
+            jobs.append((idx, cand))
+
+    written = len(existing or ())
     skipped_no_image = 0
     skipped_status = 0
     skipped_map_only = 0
 
-    for idx, cand in enumerate(pool, start=1):
-        if len(rows) >= count:
-            break
-        if cand.qid in seen:
-            continue
-        seen.add(cand.qid)
-
-        # throttle lightly
-        if idx % 25 == 0:
-            time.sleep(0.5)
-
-        try:
-            ent = wikidata_entity(s, cand.qid)
-        except Exception:
-            continue
-
-        mass_kg = best_mass_kg(ent)
-        lifespan_yr = best_lifespan_yr(ent)
-        gestation_days = best_gestation_days(ent)
-        litter_size = best_litter_size(ent)
-        max_speed_mph = best_speed_mph(ent)
-        conservation_status = best_conservation_status(ent, s, label_cache)
-        scientific_name = best_scientific_name(ent)
-
-        # popularity
-        try:
-            views_30d = pageviews_last_30d(s, cand.enwiki_title)
-        except Exception:
-            views_30d = None
-
-        # lead image from enwiki, but keep it ONLY if it resolves to a Commons file (reusable)
-        image_url = None
-        image_file_page = None
-        image_license = None
-        image_attribution = None
-
-        try:
-            _lead_url, filename = lead_image_from_enwiki(s, cand.enwiki_title)
-            if filename:
-                file_page, direct_url, lic, attrib = commons_metadata_for_filename(s, filename)
-                # If not on Commons, we leave blank to avoid accidentally using non-free enwiki-only files.
-                if direct_url and file_page:
-                    image_url = direct_url
-                    image_file_page = file_page
-                    image_license = lic
-                    image_attribution = attrib
-
-                    # If the lead image appears to be a map/territory image, try to replace it
-                    # with another non-map image used on the same page.
-                    if is_map_like_image_name_or_url(filename) or is_map_like_image_name_or_url(direct_url):
-                        page_images = page_image_filenames_from_enwiki(s, cand.enwiki_title)
-                        fallback_found = False
-                        for alt_filename in page_images:
-                            if alt_filename == filename:
-                                continue
-                            if is_map_like_image_name_or_url(alt_filename):
-                                continue
-                            alt_file_page, alt_direct_url, alt_lic, alt_attrib = commons_metadata_for_filename(s, alt_filename)
-                            if alt_direct_url and alt_file_page and not is_map_like_image_name_or_url(alt_direct_url):
-                                image_url = alt_direct_url
-                                image_file_page = alt_file_page
-                                image_license = alt_lic
-                                image_attribution = alt_attrib
-                                fallback_found = True
-                                break
-
-                        if not fallback_found:
-                            image_url = None
-                            image_file_page = None
-                            image_license = None
-                            image_attribution = None
-                            skipped_map_only += 1
-        except Exception:
-            pass
-
-        if not image_url:
-            skipped_no_image += 1
-            continue
-        if not is_usable_conservation_status(conservation_status):
-            skipped_status += 1
-            continue
-
-        rows.append(
-            {
-                "wikidata_id": cand.qid,
-                "common_name": cand.label,
-                "scientific_name": scientific_name,
-                "wikipedia_title": cand.enwiki_title,
-                "source_url": wikipedia_url(cand.enwiki_title),
-
-                "mass_kg": mass_kg,
-                "lifespan_yr": lifespan_yr,
-                "gestation_days": gestation_days,
-                "litter_size": litter_size,
-                "max_speed_mph": max_speed_mph,
-                "conservation_status": conservation_status,
-
-                "pageviews_30d": views_30d,
-
-                "image_url": image_url,
-                "image_file_page": image_file_page,
-                "image_license": image_license,
-                "image_attribution": image_attribution,
+    # Rows are written (and flushed) as they are produced, so an interrupted run can be
+    # continued with --resume.
+    print(f"Writing rows to CSV: {out_path}")
+    mode = "a" if existing is not None else "w"
+    with open(out_path, mode, newline="", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=workers) as executor:
+        w = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if existing is None:
+            w.writeheader()
+        for start in range(0, len(jobs), CANDIDATES_PER_CHUNK):
+            if written >= count:
+                break
+
+            chunk = jobs[start : start + CANDIDATES_PER_CHUNK]
+            entities = wikidata_entities_batch(s, [cand.qid for _, cand in chunk])
+            traits = {qid: extract_all(ent) for qid, ent in entities.items()}
+            wikidata_labels_batch(
+                s,
+                [qid for t in traits.values() for qid in t["status_qids"]],
+                label_cache,
+            )
+            # Cheapest filter first: the status needs no further requests, then images are
+            # looked up only for usable statuses, and pageviews (which never reject a row)
+            # only for candidates that also have an image.
+            statuses = {
+                qid: best_conservation_status(t["status_qids"], s, label_cache) for qid, t in traits.items()
             }
-        )
-
-        if len(rows) % 25 == 0:
-            print(f"Collected {len(rows)}/{count} rows so far (latest: {cand.label}).")
-        if idx % 100 == 0:
-            print(f"Scanned {idx}/{len(pool)} candidates; valid rows={len(rows)}.")
-
-    fieldnames = [
-        "wikidata_id",
-        "common_name",
-        "scientific_name",
-        "wikipedia_title",
-        "source_url",
-        "mass_kg",
-        "lifespan_yr",
-        "gestation_days",
-        "litter_size",
-        "max_speed_mph",
-        "conservation_status",
-        "pageviews_30d",
-        "image_url",
-        "image_file_page",
-        "image_license",
-        "image_attribution",
-    ]
+            titles = [
+                cand.enwiki_title for _, cand in chunk if is_usable_conservation_status(statuses.get(cand.qid))
+            ]
+            images = reusable_images(s, executor, titles)
+            titles = [title for title in titles if images[title][0] is not None]
+            if popularity_source == "sitelinks":
+                views = {cand.enwiki_title: cand.sitelinks for _, cand in chunk}
+            else:
+                views = dict(zip(titles, executor.map(lambda title: pageviews_or_none(s, title), titles)))
+            for idx, cand in chunk:
+                if written >= count:
+                    break
+                image, map_only = images.get(cand.enwiki_title, (None, False))
+                row, outcome = candidate_row(
+                    cand,
+                    traits.get(cand.qid),
+                    statuses.get(cand.qid),
+                    views.get(cand.enwiki_title),
+                    image,
+                    map_only,
+                )
+                if outcome == "map_only":
+                    skipped_map_only += 1
+                    skipped_no_image += 1
+                elif outcome == "no_image":
+                    skipped_no_image += 1
+                elif outcome == "status":
+                    skipped_status += 1
+                if row is None:
+                    continue
+
+                w.writerow(row)
+                f.flush()
+                written += 1
+
+                if written % 25 == 0:
+                    print(f"Collected {written}/{count} rows so far (latest: {cand.label}).")
+                if idx % 100 == 0:
+                    print(f"Scanned {idx}/{len(pool)} candidates; valid rows={written}.")
 
     print(f"Skipped {skipped_no_image} candidates with no reusable image.")
     print(f"Skipped {skipped_map_only} candidates with only map-like images on page.")
     print("Skipped "
           f"{skipped_status} candidates with missing/Data Deficient conservation status.")
-    print(f"Writing {len(rows)} rows to CSV: {out_path}")
-    with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
-
-    print(f"Wrote {len(rows)} rows to {out_path}")
-    if len(rows) < count:
+    print(f"Wrote {written} rows to {out_path}")
+    if written < count:
         print("Tip: rerun with a different --seed or increase the SPARQL limits in the script.")
 
 
@@ -720,8 +1100,40 @@ def main() -> None:
     ap.add_argument("--count", type=int, default=200)
     ap.add_argument("--seed", type=int, default=20260207)
     ap.add_argument("--out", type=str, default="mammals_mvp.csv")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent candidate lookups")
+    default_cache_path = Path(__file__).resolve().parent / DEFAULT_CACHE_NAME
+    ap.add_argument(
+        "--cache-path",
+        type=str,
+        default=str(default_cache_path),
+        help=f"SQLite cache of API responses, kept for {CACHE_TTL.days} days (default: {default_cache_path})",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
+    ap.add_argument(
+        "--popularity-source",
+        choices=POPULARITY_SOURCES,
+        default="pageviews",
+        help=(
+            "What goes in pageviews_30d: enwiki views over the last 30 days (one request per "
+            "candidate) or the Wikidata sitelink count (no extra requests)"
+        ),
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to an existing --out file, skipping species already in it (its rows count toward --count)",
+    )
     args = ap.parse_args()
-    build_csv(args.count, args.seed, args.out)
+    cache_path = None if args.no_cache or not args.cache_path else Path(args.cache_path)
+    build_csv(
+        args.count,
+        args.seed,
+        args.out,
+        workers=max(1, args.workers),
+        cache_path=cache_path,
+        popularity_source=args.popularity_source,
+        resume=args.resume,
+    )
 
 
 if __name__ == "__main__":